@@ -3,35 +3,53 @@ Main entry point for the Natural Language to SQL CLI application.
 """
 import argparse
 import sys
-import json
-from ..utils.config_manager import config_manager
 
 
-def main():
-    parser = argparse.ArgumentParser(description='Natural Language to SQL Converter')
-    
-    # Add subparsers for different commands
-    subparsers = parser.add_subparsers(dest='command', help='Available commands')
-    
-    # Configuration command
-    config_parser = subparsers.add_parser('config', help='Configure database and table descriptions')
+def _add_config_arguments(config_parser):
     config_parser.add_argument('--db-url', type=str, help='Database URL to set')
     config_parser.add_argument('--table-descriptions', type=str, help='Path to JSON file containing custom table descriptions')
     config_parser.add_argument('--show', action='store_true', help='Show current configuration')
     config_parser.add_argument('--reset', action='store_true', help='Reset configuration to defaults')
-    
-    # Query command
-    query_parser = subparsers.add_parser('query', help='Run a natural language query')
+
+
+def _add_query_arguments(query_parser):
     query_parser.add_argument('--db-url', type=str, help='Database URL (overrides config)')
     query_parser.add_argument('--query', type=str, required=True, help='Natural language query to convert to SQL')
     query_parser.add_argument('--table-descriptions', type=str, help='Path to JSON file containing custom table descriptions (overrides config)')
-    
-    # Interactive mode command
-    interactive_parser = subparsers.add_parser('interactive', help='Run in interactive mode')
+    query_parser.add_argument('--min-score', type=float, help='Minimum similarity for a table to be included in the prompt')
+
+
+def _add_interactive_arguments(interactive_parser):
     interactive_parser.add_argument('--db-url', type=str, help='Database URL (overrides config)')
     interactive_parser.add_argument('--table-descriptions', type=str, help='Path to JSON file containing custom table descriptions (overrides config)')
+    interactive_parser.add_argument('--min-score', type=float, help='Minimum similarity for a table to be included in the prompt')
+
+
+# Command name -> (help text, argument builder). Arguments are only added for
+# the command actually being run, so e.g. `nsql config` never pays for the others.
+COMMANDS = {
+    'config': ('Configure database and table descriptions', _add_config_arguments),
+    'query': ('Run a natural language query', _add_query_arguments),
+    'interactive': ('Run in interactive mode', _add_interactive_arguments),
+}
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+
+    parser = argparse.ArgumentParser(description='Natural Language to SQL Converter')
+    
+    # Add subparsers for different commands
+    subparsers = parser.add_subparsers(dest='command', help='Available commands')
+    
+    selected = argv[0] if argv else None
+    for name, (help_text, add_arguments) in COMMANDS.items():
+        command_parser = subparsers.add_parser(name, help=help_text)
+        if name == selected:
+            add_arguments(command_parser)
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     if args.command == 'config':
         handle_config_command(args)
@@ -50,6 +68,7 @@ def main():
 
 def handle_config_command(args):
     """Handle the configuration command."""
+    from ..utils.config_manager import config_manager
     if args.show:
         # Show current configuration
         config = config_manager.get_config()
@@ -84,6 +103,8 @@ def handle_config_command(args):
 def handle_query_command(args):
     """Handle the query command."""
     from ..core.nsql_agent import NSQLAgent
+    from ..utils.config_manager import config_manager
+    from ..utils.helpers import load_table_descriptions
     # Get configuration values, with command-line args taking precedence
     db_url = args.db_url or config_manager.get_db_url()
     table_descriptions_file = args.table_descriptions or config_manager.get_table_descriptions_file()
@@ -96,15 +117,14 @@ def handle_query_command(args):
     custom_table_descriptions = []
     if table_descriptions_file:
         try:
-            with open(table_descriptions_file, 'r') as f:
-                custom_table_descriptions = json.load(f)
+            custom_table_descriptions = load_table_descriptions(table_descriptions_file)
             print(f"Loaded {len(custom_table_descriptions)} custom table descriptions from {table_descriptions_file}")
         except Exception as e:
             print(f"Error loading table descriptions: {e}")
             sys.exit(1)
     
     # Initialize the NSQL agent
-    agent = NSQLAgent(db_url=db_url, custom_table_descriptions=custom_table_descriptions)
+    agent = NSQLAgent(db_url=db_url, custom_table_descriptions=custom_table_descriptions, min_score=args.min_score)
     
     # Process the query
     result = agent.process_query(args.query)
@@ -114,6 +134,8 @@ def handle_query_command(args):
 def handle_interactive_command(args):
     """Handle the interactive command."""
     from ..core.nsql_agent import NSQLAgent
+    from ..utils.config_manager import config_manager
+    from ..utils.helpers import load_table_descriptions
     # Get configuration values, with command-line args taking precedence
     db_url = args.db_url or config_manager.get_db_url()
     table_descriptions_file = args.table_descriptions or config_manager.get_table_descriptions_file()
@@ -126,15 +148,14 @@ def handle_interactive_command(args):
     custom_table_descriptions = []
     if table_descriptions_file:
         try:
-            with open(table_descriptions_file, 'r') as f:
-                custom_table_descriptions = json.load(f)
+            custom_table_descriptions = load_table_descriptions(table_descriptions_file)
             print(f"Loaded {len(custom_table_descriptions)} custom table descriptions from {table_descriptions_file}")
         except Exception as e:
             print(f"Error loading table descriptions: {e}")
             sys.exit(1)
     
     # Initialize the NSQL agent
-    agent = NSQLAgent(db_url=db_url, custom_table_descriptions=custom_table_descriptions)
+    agent = NSQLAgent(db_url=db_url, custom_table_descriptions=custom_table_descriptions, min_score=args.min_score)
     
     run_interactive_mode(agent)
 
@@ -1,35 +1,64 @@
 """
 Core NSQL agent that handles the main logic for converting natural language to SQL.
 """
+import asyncio
+import csv
+import functools
+import io
 import logging
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from sqlalchemy import create_engine, inspect, text
 from ..models.gemini_llm import GeminiLLM
-from .rag_system import RAGSystem
+from .rag_system import DEFAULT_MIN_SCORE, RAGSystem
 from ..utils.helpers import validate_and_sanitize_query
 
+# Maximum number of result rows included in the output of a query
+MAX_RESULT_ROWS = 1000
+
 
 class NSQLAgent:
-    def __init__(self, db_url: str, custom_table_descriptions: List[Dict[str, Any]] = None):
+    def __init__(self, db_url: str, custom_table_descriptions: List[Dict[str, Any]] = None,
+                 min_score: Optional[float] = None):
         self.db_url = db_url
-        self.engine = create_engine(db_url)
-        self.inspector = inspect(self.engine)
+        # Minimum table similarity for retrieval; None uses the RAG system default
+        self.min_score = DEFAULT_MIN_SCORE if min_score is None else min_score
+        # Connections are pooled and reused across queries; pre-ping replaces
+        # connections the server dropped while the session was idle
+        self.engine = create_engine(db_url, pool_pre_ping=True)
         self.gemini_llm = GeminiLLM()
         self.rag_system = RAGSystem(self.engine, custom_table_descriptions)
         self.logger = logging.getLogger(__name__)
+        # Event loop runner for process_queries, kept until close() because the
+        # Gemini async client stays bound to the loop of its first call
+        self._runner: Optional[asyncio.Runner] = None
+        
+    def __enter__(self) -> "NSQLAgent":
+        return self
+        
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+        
+    def close(self) -> None:
+        """
+        Close the event loop used by process_queries; a later call starts a new one.
+        """
+        if self._runner is not None:
+            self._runner.close()
+            self._runner = None
+        
+    @functools.cached_property
+    def inspector(self):
+        """
+        Database inspector, created on first use since the agent itself doesn't need one.
+        """
+        return inspect(self.engine)
         
     def process_query(self, natural_query: str) -> str:
         """
         Process a natural language query and return the corresponding SQL query.
         """
         try:
-            self.logger.info(f"Processing natural language query: {natural_query}")
-            
-            # Step 1: Retrieve relevant table information using RAG
-            self.logger.debug("Retrieving relevant tables using RAG system...")
-            relevant_tables = self.rag_system.retrieve_relevant_tables(natural_query)
-            self.logger.debug(f"Found {len(relevant_tables)} relevant tables")
-            
+            relevant_tables = self._retrieve_relevant_tables(natural_query)
             if not relevant_tables:
                 return "No relevant tables found for the given query."
             
@@ -38,22 +67,72 @@ class NSQLAgent:
             sql_query = self.gemini_llm.generate_sql(natural_query, relevant_tables)
             self.logger.debug(f"Generated SQL query: {sql_query}")
             
-            # Step 3: Validate and sanitize the SQL query
-            is_valid, sanitized_query = validate_and_sanitize_query(sql_query)
-            if not is_valid:
-                return f"Generated SQL query contains potentially dangerous operations: {sql_query}"
+            # Steps 3 and 4: Validate, sanitize and execute the SQL query
+            return self._run_generated_sql(sql_query)
+            
+        except Exception as e:
+            self.logger.error(f"Error processing query: {str(e)}")
+            return f"Error processing query: {str(e)}"
+        
+    async def aprocess_query(self, natural_query: str) -> str:
+        """
+        Async version of process_query. The LLM call is awaited, so many queries can be processed concurrently.
+        """
+        try:
+            # Embedding the query and searching the index are CPU-bound, so run them off the event loop
+            relevant_tables = await asyncio.to_thread(self._retrieve_relevant_tables, natural_query)
+            if not relevant_tables:
+                return "No relevant tables found for the given query."
             
-            # Step 4: Validate and execute the SQL query
-            result = self.validate_and_execute(sanitized_query)
+            # Step 2: Generate SQL using Gemini LLM with table context
+            sql_query = await self.gemini_llm.agenerate_sql(natural_query, relevant_tables)
+            self.logger.debug(f"Generated SQL query: {sql_query}")
             
-            # Return both the SQL query and the result
-            result_str = f"Generated SQL: {sanitized_query}\n\nResult:\n{result}"
-            return result_str
+            # Steps 3 and 4: Validate, sanitize and execute the SQL query off the event loop
+            return await asyncio.to_thread(self._run_generated_sql, sql_query)
             
         except Exception as e:
             self.logger.error(f"Error processing query: {str(e)}")
             return f"Error processing query: {str(e)}"
         
+    def process_queries(self, natural_queries: List[str]) -> List[str]:
+        """
+        Process several natural language queries concurrently, returning the results in the same order.
+        Must not be called from a running event loop; await aprocess_query there instead.
+        """
+        if self._runner is None:
+            self._runner = asyncio.Runner()
+        
+        async def process_all():
+            return await asyncio.gather(*(self.aprocess_query(q) for q in natural_queries))
+        
+        return list(self._runner.run(process_all()))
+        
+    def _retrieve_relevant_tables(self, natural_query: str) -> List[Dict[str, Any]]:
+        """
+        Step 1 of processing a query: retrieve relevant table information using RAG.
+        """
+        self.logger.info(f"Processing natural language query: {natural_query}")
+        self.logger.debug("Retrieving relevant tables using RAG system...")
+        relevant_tables = self.rag_system.retrieve_relevant_tables(natural_query, min_score=self.min_score)
+        self.logger.debug(f"Found {len(relevant_tables)} relevant tables")
+        return relevant_tables
+        
+    def _run_generated_sql(self, sql_query: str) -> str:
+        """
+        Validate, sanitize and execute a generated SQL query and format the output.
+        """
+        # Validate and sanitize the SQL query
+        is_valid, sanitized_query = validate_and_sanitize_query(sql_query)
+        if not is_valid:
+            return f"Generated SQL query contains potentially dangerous operations: {sql_query}"
+        
+        # Validate and execute the SQL query
+        result = self.validate_and_execute(sanitized_query)
+        
+        # Return both the SQL query and the result
+        return f"Generated SQL: {sanitized_query}\n\nResult:\n{result}"
+        
     def add_custom_table_descriptions(self, custom_table_descriptions: List[Dict[str, Any]]):
         """
         Add custom table descriptions to the RAG system.
@@ -71,26 +150,29 @@ class NSQLAgent:
             if sql_query_lower.startswith('delete') or sql_query_lower.startswith('drop'):
                 return f"Only SELECT statements are allowed: {sql_query}"
 
-            # Execute the query using SQLAlchemy's text() for safety
+            # Execute the query using SQLAlchemy's text() for safety, on a
+            # connection checked out from the engine's pool
             with self.engine.connect() as conn:
                 # Execute the query and get the result
                 result = conn.execute(text(sql_query))
-                rows = result.fetchall()
                 
                 # Get column names for display
                 columns = list(result.keys())
                 
-                # Convert results to string format
+                # Fetch at most MAX_RESULT_ROWS rows instead of the whole result set
+                rows = result.fetchmany(MAX_RESULT_ROWS)
                 if not rows:
                     return "No results found."
                 
-                # Format the result in a readable way
-                result_str = "Columns: " + ", ".join(columns) + "\n"
-                result_str += "-" * 50 + "\n"  # separator line
+                # Format the result as CSV, with the column names as header row
+                buf = io.StringIO()
+                writer = csv.writer(buf, lineterminator="\n")
+                writer.writerow(columns)
+                writer.writerows(rows)
                 
-                for row in rows:
-                    result_str += str(tuple(row)) + "\n"
+                if result.fetchone() is not None:
+                    buf.write(f"... (output truncated to {MAX_RESULT_ROWS} rows)\n")
                     
-                return result_str
+                return buf.getvalue()
         except Exception as e:
             return f"Error executing SQL query: {str(e)}"
\ No newline at end of file
@@ -1,10 +1,17 @@
 """
 RAG (Retrieval Augmented Generation) system for retrieving relevant table information.
 """
-from typing import List, Dict, Any
-from sqlalchemy import inspect
-from typing import List, Dict, Any
-from sqlalchemy import inspect
+import functools
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+from sqlalchemy import Engine, inspect
+from sqlalchemy.pool import SingletonThreadPool, StaticPool
 from sentence_transformers import SentenceTransformer
 import faiss
 import numpy as np
@@ -12,33 +19,107 @@ import pandas as pd
 import faiss
 import numpy as np
 import pandas as pd
+from ..utils.helpers import render_table_prompt_block
+
+
+EMBEDDING_MODEL_NAME = 'sentence-transformers/all-mpnet-base-v2'
+
+# Shared encode() settings; embeddings come back L2-normalized for cosine similarity
+ENCODE_KWARGS = {
+    'batch_size': 64,
+    'convert_to_numpy': True,
+    'normalize_embeddings': True,
+    'show_progress_bar': False,
+}
+
+# Number of query embeddings kept per RAGSystem for repeated queries
+QUERY_CACHE_SIZE = 256
+
+# Minimum cosine similarity for a table to be considered relevant to a query
+DEFAULT_MIN_SCORE = 0.25
+
+# Schemas with at least this many tables use an HNSW index instead of exhaustive search
+HNSW_MIN_TABLES = 256
+
+# Schemas with more than this many tables also store vectors as 8-bit scalar
+# quantized codes (4x smaller than float32)
+SQ8_MIN_TABLES = 1024
+
+# Schemas with fewer tables than this are inspected serially
+PARALLEL_INSPECT_MIN_TABLES = 8
+
+# On-disk cache of table description FAISS indexes, keyed by database, inspected schema
+# and custom table descriptions; NSQL_CACHE_DIR overrides $XDG_CACHE_HOME/nsql (~/.cache/nsql)
+EMBEDDING_CACHE_DIR = Path(
+    os.environ.get('NSQL_CACHE_DIR')
+    or os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'nsql')
+)
+
+# Maximum number of cached indexes; the least recently used ones are removed
+MAX_CACHED_INDEXES = 16
+
+
+@functools.lru_cache(maxsize=4)
+def _load_st_model(model_name: str) -> SentenceTransformer:
+    """Load a SentenceTransformer model once per process and reuse it."""
+    model = SentenceTransformer(model_name)
+    if model.device.type == 'cuda':
+        # Half precision forward pass on GPU; results are cast back to float32 for FAISS
+        model.half()
+    return model
+
+
+def _format_columns(columns: List[Dict[str, Any]]) -> List[str]:
+    """Format each column as text for the table embedding description."""
+    col_strs = []
+    for col in columns:
+        col_str = f"{col['name']} of type {col['type']}"
+        if col.get('primary_key'):
+            col_str += " (primary key)"
+        if col.get('nullable', True) == False:
+            col_str += " (not null)"
+        col_strs.append(col_str)
+    return col_strs
 
 
 class RAGSystem:
-    def __init__(self, engine, custom_table_descriptions=None):
+    def __init__(self, engine: Engine, custom_table_descriptions: Optional[List[Dict[str, Any]]] = None) -> None:
         self.engine = engine
         self.inspector = inspect(engine)
         # self.model = SentenceTransformer('all-MiniLM-L6-v2')  # Lightweight model for embeddings
-        self.model = SentenceTransformer('sentence-transformers/all-mpnet-base-v2')  # Lightweight model for embeddings
+        self.model = _load_st_model(EMBEDDING_MODEL_NAME)
+        self._query_cache: OrderedDict[str, np.ndarray] = OrderedDict()
+        # Queries may be retrieved from several threads (NSQLAgent.aprocess_query)
+        self._query_cache_lock = threading.Lock()
 
         # Build the table index
         self.table_descriptions = self._get_table_descriptions(custom_table_descriptions)
         self._build_index()
         
-    def _get_table_descriptions(self, custom_table_descriptions=None) -> List[Dict[str, Any]]:
+    def _get_table_descriptions(self, custom_table_descriptions: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
         """Extract descriptions for all tables in the database."""
         descriptions = []
         
+        # Fetch columns and foreign keys of all tables, concurrently for network
+        # databases since each table costs separate round-trips
+        table_names = self.inspector.get_table_names()
+        if self._can_inspect_concurrently(len(table_names)):
+            max_workers = min(16, (os.cpu_count() or 1) * 4)
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                inspected = list(executor.map(self._inspect_table, table_names))
+        else:
+            inspected = [
+                (self.inspector.get_columns(table_name), self.inspector.get_foreign_keys(table_name))
+                for table_name in table_names
+            ]
+        
         # Add descriptions for tables in the database
-        for table_name in self.inspector.get_table_names():
-            # Get columns info
-            columns_info = self.inspector.get_columns(table_name)
-            
+        for table_name, (columns_info, foreign_keys) in zip(table_names, inspected):
             # Get primary keys
             primary_keys = [col['name'] for col in columns_info if col.get('primary_key', False)]
             
-            # Get foreign keys
-            foreign_keys = self.inspector.get_foreign_keys(table_name)
+            # Foreign key columns, looked up per column below
+            fk_cols = {c for fk in foreign_keys for c in (fk.get('constrained_columns') or ())}
             
             # Create table description
             table_description = {
@@ -56,170 +137,229 @@ class RAGSystem:
                     'nullable': col.get('nullable', True),
                     'default': col.get('default', None),
                     'primary_key': col.get('primary_key', False),
-                    'foreign_key': any(fk['constrained_columns'] and col['name'] in fk['constrained_columns'] for fk in foreign_keys)
+                    'foreign_key': col['name'] in fk_cols
                 }
                 table_description['columns'].append(col_info)
                 
             # Create a comprehensive text description of the table for embeddings
-            text_description = f"Table '{table_name}' has "
-            
-            # Add column information
-            if columns_info:
-                text_description += f"{len(columns_info)} columns: "
-                for i, col in enumerate(columns_info):
-                    text_description += f"{col['name']} of type {col['type']}"
-                    if col.get('primary_key'):
-                        text_description += " (primary key)"
-                    if col.get('nullable', True) == False:
-                        text_description += " (not null)"
-                    if i < len(columns_info) - 1:
-                        text_description += ", "
-            
-            # Add foreign key information
-            if foreign_keys:
-                text_description += f". It has foreign keys: "
-                for i, fk in enumerate(foreign_keys):
-                    text_description += f"'{fk['constrained_columns']}' references '{fk['referred_table']}.{fk['referred_columns']}'"
-                    if i < len(foreign_keys) - 1:
-                        text_description += ", "
-            
-            # Add primary key information
-            if primary_keys:
-                text_description += f". Primary keys: {', '.join(primary_keys)}."
-            
-            table_description['text_description'] = text_description
+            table_description['text_description'] = self._format_table_text(table_description)
+            # Pre-render the table's prompt section once instead of on every query
+            table_description['prompt_block'] = render_table_prompt_block(table_description)
             descriptions.append(table_description)
         
         # Add custom table descriptions if provided
         if custom_table_descriptions:
             for custom_table in custom_table_descriptions:
-                table_description = {
-                    'name': custom_table['name'],
-                    'columns': custom_table.get('columns', []),
-                    'primary_keys': custom_table.get('primary_keys', []),
-                    'foreign_keys': custom_table.get('foreign_keys', []),
-                    'is_custom': True  # Mark as custom
-                }
-                
-                # Create a text description for the custom table
-                text_description = f"Table '{custom_table['name']}' has "
-                
-                if table_description['columns']:
-                    text_description += f"{len(table_description['columns'])} columns: "
-                    for i, col in enumerate(table_description['columns']):
-                        text_description += f"{col['name']} of type {col['type']}"
-                        if col.get('primary_key'):
-                            text_description += " (primary key)"
-                        if col.get('nullable', True) == False:
-                            text_description += " (not null)"
-                        if i < len(table_description['columns']) - 1:
-                            text_description += ", "
-                
-                # Add primary key information
-                if table_description['primary_keys']:
-                    text_description += f". Primary keys: {', '.join(table_description['primary_keys'])}."
-                
-                # Add foreign key information
-                if table_description['foreign_keys']:
-                    text_description += f". It has foreign keys: "
-                    for i, fk in enumerate(table_description['foreign_keys']):
-                        text_description += f"'{fk['constrained_columns']}' references '{fk['referred_table']}.{fk['referred_columns']}'"
-                        if i < len(table_description['foreign_keys']) - 1:
-                            text_description += ", "
-                
-                table_description['text_description'] = text_description
-                descriptions.append(table_description)
+                descriptions.append(self._build_custom_table_description(custom_table))
             
         return descriptions
     
-    def _build_index(self):
-        """Build FAISS index for similarity search."""
-        # Get embeddings for all table descriptions
+    def _can_inspect_concurrently(self, num_tables: int) -> bool:
+        """
+        Whether tables can be inspected from worker threads. SQLite has no round-trips
+        to overlap, and per-thread or single-connection pools (e.g. in-memory SQLite)
+        would give each worker its own connection or share one across threads.
+        """
+        if num_tables < PARALLEL_INSPECT_MIN_TABLES:
+            return False
+        if self.engine.dialect.name == 'sqlite':
+            return False
+        return not isinstance(self.engine.pool, (SingletonThreadPool, StaticPool))
+    
+    def _inspect_table(self, table_name: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Return the columns and foreign keys of a database table."""
+        # Inspectors cache results internally and are not shared between threads
+        inspector = inspect(self.engine)
+        return inspector.get_columns(table_name), inspector.get_foreign_keys(table_name)
+    
+    def _build_custom_table_description(self, custom_table: Dict[str, Any]) -> Dict[str, Any]:
+        """Build a table description entry from a user supplied table description."""
+        table_description = {
+            'name': custom_table['name'],
+            'columns': custom_table.get('columns', []),
+            'primary_keys': custom_table.get('primary_keys', []),
+            'foreign_keys': custom_table.get('foreign_keys', []),
+            'is_custom': True  # Mark as custom
+        }
+        table_description['text_description'] = self._format_table_text(table_description)
+        table_description['prompt_block'] = render_table_prompt_block(table_description)
+        return table_description
+    
+    def _format_table_text(self, table_description: Dict[str, Any]) -> str:
+        """Create the text description of a table that is used for embeddings."""
+        columns = table_description['columns']
+        foreign_keys = table_description['foreign_keys']
+        primary_keys = table_description['primary_keys']
+        
+        parts = [f"Table '{table_description['name']}' has "]
+        
+        # Add column information
+        if columns:
+            parts.append(f"{len(columns)} columns: ")
+            parts.append(", ".join(_format_columns(columns)))
+        
+        # Add foreign key information
+        if foreign_keys:
+            parts.append(". It has foreign keys: ")
+            parts.append(", ".join(
+                f"'{fk['constrained_columns']}' references '{fk['referred_table']}.{fk['referred_columns']}'"
+                for fk in foreign_keys
+            ))
+        
+        # Add primary key information
+        if primary_keys:
+            parts.append(f". Primary keys: {', '.join(primary_keys)}.")
+        
+        return "".join(parts)
+    
+    def _build_index(self) -> None:
+        """Build FAISS index for similarity search, reusing the index saved on disk for an unchanged schema."""
         descriptions = [table['text_description'] for table in self.table_descriptions]
-        embeddings = self.model.encode(descriptions)
+        inspected = [table['text_description'] for table in self.table_descriptions if not table['is_custom']]
+        custom = [table['text_description'] for table in self.table_descriptions if table['is_custom']]
+        cache_key = f"{self._database_cache_key()}-{self._schema_cache_key(inspected)}-{self._schema_cache_key(custom)[:16]}"
+        index_file = EMBEDDING_CACHE_DIR / f"{cache_key}.faiss"
         
-        # Normalize embeddings for cosine similarity
-        embeddings = embeddings.astype('float32')
-        faiss.normalize_L2(embeddings)
+        # The index holds the vectors itself (index.reconstruct), so no separate copy is kept
+        if index_file.exists():
+            try:
+                self.index = faiss.read_index(str(index_file))
+                # Mark the entry as recently used for pruning
+                os.utime(index_file)
+                return
+            except Exception:
+                # Corrupt or unreadable cache entry, fall back to building
+                pass
+        
+        # Get embeddings for all table descriptions, as the contiguous float32 array FAISS expects
+        embeddings = np.ascontiguousarray(self.model.encode(descriptions, **ENCODE_KWARGS), dtype='float32')
         
         # Create FAISS index
         dimension = embeddings.shape[1]
-        self.index = faiss.IndexFlatIP(dimension)  # Inner product for cosine similarity
+        if len(descriptions) > SQ8_MIN_TABLES:
+            # Approximate search over 8-bit quantized vectors for very large schemas
+            self.index = faiss.IndexHNSWSQ(dimension, faiss.ScalarQuantizer.QT_8bit, 32, faiss.METRIC_INNER_PRODUCT)
+            self.index.hnsw.efConstruction = 64
+            self.index.train(embeddings)
+        elif len(descriptions) >= HNSW_MIN_TABLES:
+            # Approximate nearest neighbour search for large schemas
+            self.index = faiss.IndexHNSWFlat(dimension, 32, faiss.METRIC_INNER_PRODUCT)
+            self.index.hnsw.efConstruction = 64
+        else:
+            self.index = faiss.IndexFlatIP(dimension)  # Inner product for cosine similarity
         self.index.add(embeddings)
         
-    def retrieve_relevant_tables(self, query: str, k: int = 3,min_score: float = 0.25) -> List[Dict[str, Any]]:
+        try:
+            EMBEDDING_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            # Write to a temporary file first, so other processes never read a partial index
+            fd, tmp_file = tempfile.mkstemp(dir=EMBEDDING_CACHE_DIR, suffix='.tmp')
+            os.close(fd)
+            try:
+                faiss.write_index(self.index, tmp_file)
+                os.replace(tmp_file, index_file)
+            except BaseException:
+                os.unlink(tmp_file)
+                raise
+            self._prune_index_cache(cache_key)
+        except Exception:
+            # Caching is best-effort only
+            pass
+        
+    def _prune_index_cache(self, cache_key: str) -> None:
+        """
+        Remove cached indexes of earlier schemas of this database (with any custom table
+        descriptions), then the least recently used indexes beyond MAX_CACHED_INDEXES,
+        e.g. those of temporary databases.
+        """
+        database_key, schema_key, _ = cache_key.split('-')
+        entries = []
+        for path in EMBEDDING_CACHE_DIR.glob("*.faiss"):
+            if path.stem.startswith(f"{database_key}-") and not path.stem.startswith(f"{database_key}-{schema_key}-"):
+                path.unlink(missing_ok=True)
+                continue
+            try:
+                entries.append((path.stat().st_mtime_ns, path))
+            except FileNotFoundError:
+                # Removed by another process
+                pass
+        
+        entries.sort(reverse=True)
+        for _, path in entries[MAX_CACHED_INDEXES:]:
+            path.unlink(missing_ok=True)
+        
+        # Embedding files written by earlier versions
+        for path in EMBEDDING_CACHE_DIR.glob("*.npy"):
+            path.unlink(missing_ok=True)
+        
+    def _database_cache_key(self) -> str:
+        """Hash the database URL, shared by all cache entries of this database."""
+        return hashlib.sha256(str(self.engine.url).encode('utf-8')).hexdigest()[:16]
+        
+    def _schema_cache_key(self, descriptions: List[str]) -> str:
+        """
+        Hash the embedding settings and table descriptions (names, column types and keys).
+        """
+        return hashlib.sha256(
+            "\0".join([EMBEDDING_MODEL_NAME, repr(sorted(ENCODE_KWARGS.items())), *descriptions]).encode('utf-8')
+        ).hexdigest()[:32]
+        
+    def _encode_query(self, query: str) -> np.ndarray:
+        """
+        Encode a query (already normalized by the model), reusing the embedding of recent identical queries.
+        """
+        with self._query_cache_lock:
+            query_embedding = self._query_cache.get(query)
+            if query_embedding is not None:
+                self._query_cache.move_to_end(query)
+                return query_embedding
+        
+        query_embedding = np.ascontiguousarray(self.model.encode([query], **ENCODE_KWARGS), dtype='float32')
+        with self._query_cache_lock:
+            self._query_cache[query] = query_embedding
+            if len(self._query_cache) > QUERY_CACHE_SIZE:
+                self._query_cache.popitem(last=False)
+        return query_embedding
+        
+    def retrieve_relevant_tables(self, query: str, k: int = 3, min_score: float = DEFAULT_MIN_SCORE) -> List[Dict[str, Any]]:
         """
         Retrieve the most relevant tables based on the natural language query.
+        Tables scoring below min_score are left out, so an off-topic query returns no tables.
         """
-        # Encode the query
-        query_embedding = self.model.encode([query])
-        query_embedding = query_embedding.astype('float32')
-        faiss.normalize_L2(query_embedding)
-        
-        # Search for similar table descriptions
-        scores, indices = self.index.search(query_embedding, k)
-        
-        # Get the relevant table descriptions
-        relevant_tables = []
-        for i in range(min(len(indices[0]), k)):
-            idx = indices[0][i]
-            if idx < len(self.table_descriptions):
-                table_info = self.table_descriptions[idx].copy()
-                table_info['similarity_score'] = float(scores[0][i])
-                # print(table_info['similarity_score'])
-                # if table_info['similarity_score'] >= min_score:
-                #     relevant_tables.append(table_info)
-                relevant_tables.append(table_info)
-                
-        return relevant_tables
+        query_embedding = self._encode_query(query)
+        
+        # Search for similar table descriptions. HNSW search breadth is passed per call
+        # rather than set on the shared index, since queries may run on several threads
+        params = faiss.SearchParametersHNSW(efSearch=max(16, 4 * k)) if isinstance(self.index, faiss.IndexHNSW) else None
+        scores, indices = self.index.search(query_embedding, k, params=params)
+        
+        # Results are sorted by score, so nothing is relevant if the best match isn't
+        if not len(scores[0]) or scores[0][0] < min_score:
+            return []
+        
+        # Get the relevant table descriptions; FAISS pads missing results with -1
+        idxs = indices[0]
+        mask = (idxs >= 0) & (idxs < len(self.table_descriptions)) & (scores[0] >= min_score)
+        return [
+            {**self.table_descriptions[i], 'similarity_score': s}
+            for i, s in zip(idxs[mask].tolist(), scores[0][mask].tolist())
+        ]
     
-    def add_custom_table_descriptions(self, custom_table_descriptions: List[Dict[str, Any]]):
+    def add_custom_table_descriptions(self, custom_table_descriptions: List[Dict[str, Any]]) -> None:
         """
         Add custom table descriptions to the RAG system.
         """
-        # Get current descriptions count
-        initial_count = len(self.table_descriptions)
-        
-        # Add the new descriptions
-        for custom_table in custom_table_descriptions:
-            table_description = {
-                'name': custom_table['name'],
-                'columns': custom_table.get('columns', []),
-                'primary_keys': custom_table.get('primary_keys', []),
-                'foreign_keys': custom_table.get('foreign_keys', []),
-                'is_custom': True  # Mark as custom
-            }
-            
-            # Create a text description for the custom table
-            text_description = f"Table '{custom_table['name']}' has "
-            
-            if table_description['columns']:
-                text_description += f"{len(table_description['columns'])} columns: "
-                for i, col in enumerate(table_description['columns']):
-                    text_description += f"{col['name']} of type {col['type']}"
-                    if col.get('primary_key'):
-                        text_description += " (primary key)"
-                    if col.get('nullable', True) == False:
-                        text_description += " (not null)"
-                    if i < len(table_description['columns']) - 1:
-                        text_description += ", "
-            
-            # Add primary key information
-            if table_description['primary_keys']:
-                text_description += f". Primary keys: {', '.join(table_description['primary_keys'])}."
-            
-            # Add foreign key information
-            if table_description['foreign_keys']:
-                text_description += f". It has foreign keys: "
-                for i, fk in enumerate(table_description['foreign_keys']):
-                    text_description += f"'{fk['constrained_columns']}' references '{fk['referred_table']}.{fk['referred_columns']}'"
-                    if i < len(table_description['foreign_keys']) - 1:
-                        text_description += ", "
-            
-            table_description['text_description'] = text_description
-            self.table_descriptions.append(table_description)
+        new_descriptions = [
+            self._build_custom_table_description(custom_table)
+            for custom_table in custom_table_descriptions
+        ]
         
-        # Rebuild the index to include new descriptions
-        self._build_index()
+        if new_descriptions:
+            # Only encode the new tables and append them to the existing index
+            new_embeddings = np.ascontiguousarray(
+                self.model.encode([table['text_description'] for table in new_descriptions], **ENCODE_KWARGS),
+                dtype='float32',
+            )
+            self.index.add(new_embeddings)
+            self.table_descriptions.extend(new_descriptions)
         
         print(f"Added {len(custom_table_descriptions)} custom table descriptions. Total tables now: {len(self.table_descriptions)}")
\ No newline at end of file
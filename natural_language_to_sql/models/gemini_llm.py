@@ -3,13 +3,27 @@ Google Gemini LLM integration for SQL generation.
 """
 import os
 import logging
+import functools
 from typing import List, Dict, Any
 import google.generativeai as genai
 from google.generativeai.types import GenerationConfig
 from smolagents import OpenAIServerModel
+from ..utils import _patterns
+from ..utils.helpers import render_table_prompt_block
+
+
+@functools.lru_cache(maxsize=128)
+def _extract_sql_block(response_text: str) -> str:
+    """
+    Return the contents of the first ```sql code block in the response, else of the
+    first code block of any kind, else the whole response.
+    """
+    m = _patterns.SQL_CODE_BLOCK.search(response_text) or _patterns.CODE_BLOCK.search(response_text)
+    return (m.group(1) if m else response_text).strip()
+
 
 class GeminiLLM:
-    def __init__(self, model_name: str = "gemini-2.5-flash"):
+    def __init__(self, model_name: str = "gemini-2.5-flash") -> None:
         # Get API key from environment variable
         api_key = os.getenv("GEMINI_API_KEY")
         if not api_key:
@@ -44,13 +58,29 @@ class GeminiLLM:
             self.logger.error(f"Error generating SQL: {str(e)}")
             raise
 
+    async def agenerate_sql(self, natural_query: str, relevant_tables: List[Dict[str, Any]]) -> str:
+        """
+        Async version of generate_sql, for running many queries concurrently.
+        """
+        try:
+            prompt = self._create_prompt(natural_query, relevant_tables)
+            response = await self.model.generate_content_async(prompt)
+
+            # Log the response for debugging
+            self.logger.debug(f"LLM Response: {response.text}")
+
+            return self._extract_sql_query(response.text)
+        except Exception as e:
+            self.logger.error(f"Error generating SQL: {str(e)}")
+            raise
+
 
 
     def _create_prompt(self, natural_query: str, relevant_tables: List[Dict[str, Any]]) -> str:
         """
         Create a prompt for the LLM with the natural query and relevant table information.
         """
-        prompt = f"""
+        parts = [f"""
         You are an expert SQL developer. Your task is to convert natural language queries into correct, executable SQL queries.
         
         ## Instructions:
@@ -67,70 +97,23 @@ class GeminiLLM:
         
         ## Relevant Database Tables and Structures:
         
-        """
+        """]
         # print("TABLES:",relevant_tables)
+        # Table blocks are normally pre-rendered once per schema by the RAG system
         for table in relevant_tables:
-            prompt += f"\n### Table: `{table['name']}`\n"
-            prompt += f"**Columns:**\n"
-            for col in table['columns']:
-                nullable_str = "NOT NULL" if col.get('nullable', True) == False else "NULL"
-                primary_key_str = " (PRIMARY KEY)" if col.get('primary_key', False) else ""
-                foreign_key_str = " (FOREIGN KEY)" if col.get('foreign_key', False) else ""
-                
-                prompt += f"- `{col['name']}`: {col['type']} [{nullable_str}{primary_key_str}{foreign_key_str}]"
-                if col.get('default') is not None:
-                    prompt += f", default: {col['default']}"
-                prompt += "\n"
-                
-            # Add primary key information
-            primary_keys = table.get('primary_keys', [])
-            if primary_keys:
-                prompt += f"\n**Primary Keys:** {', '.join([f'`{pk}`' for pk in primary_keys])}\n"
-            
-            # Add foreign key information
-            foreign_keys = table.get('foreign_keys', [])
-            if foreign_keys:
-                prompt += f"\n**Foreign Keys:**\n"
-                for fk in foreign_keys:
-                    prompt += f"- `{fk['constrained_columns']}` references `{fk['referred_table']}.{fk['referred_columns']}`\n"
+            parts.append(table.get('prompt_block') or render_table_prompt_block(table))
         
-        prompt += f"""
+        parts.append("""
         
         ## Output:
         Please provide only the SQL query that answers the natural language query. No explanations.
-        """
+        """)
         
-        return prompt
+        return "".join(parts)
     
     def _extract_sql_query(self, response_text: str) -> str:
         """
         Extract the SQL query from the LLM response.
         """
-        # Remove common markdown code block indicators and clean up
-        cleaned_response = response_text.strip()
-        
-        # Handle various code block formats
-        if "```sql" in cleaned_response:
-            start = cleaned_response.find("```sql") + len("```sql")
-            end = cleaned_response.find("```", start)
-            if end == -1:  # If no closing backticks, use the end of the string
-                end = len(cleaned_response)
-            sql_query = cleaned_response[start:end].strip()
-        elif "```" in cleaned_response:
-            start = cleaned_response.find("```")
-            # Skip the language identifier if present
-            if start + 3 < len(cleaned_response) and cleaned_response[start+3:start+4].isalpha():
-                # There's a language identifier like ```python
-                next_newline = cleaned_response.find("\n", start)
-                start = next_newline if next_newline != -1 else start + 3
-            else:
-                start += 3  # Skip the ``` part
-            end = cleaned_response.find("```", start)
-            if end == -1:  # If no closing backticks, use the end of the string
-                end = len(cleaned_response)
-            sql_query = cleaned_response[start:end].strip()
-        else:
-            # If no code blocks, return the whole response
-            sql_query = cleaned_response
-            
-        return sql_query
+        return _extract_sql_block(response_text)
+
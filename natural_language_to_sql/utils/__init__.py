@@ -1,6 +1,19 @@
 """
 Utils module for the Natural Language to SQL application.
 """
-from .config_manager import config_manager
+from . import config_manager as _config_manager_module
 
-__all__ = ['config_manager']
\ No newline at end of file
+# Importing the submodule bound `config_manager` to the module itself; drop that
+# binding so the name always resolves to the ConfigManager instance below
+del config_manager
+
+__all__ = ['config_manager']
+
+
+def __getattr__(name):
+    # Defer creating the global configuration manager until it is used
+    if name == 'config_manager':
+        config_manager = _config_manager_module.config_manager
+        globals()['config_manager'] = config_manager
+        return config_manager
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,32 @@
+"""
+Precompiled regular expressions shared across the Natural Language to SQL application.
+"""
+import re
+
+
+# Dangerous SQL commands that could modify data or schema
+DANGEROUS_KEYWORDS = frozenset({
+    'drop', 'delete', 'truncate', 'alter', 'create', 'insert', 'update',
+    'grant', 'revoke', 'commit', 'rollback', 'savepoint', 'merge'
+})
+
+# Whole-word, case-insensitive match of any dangerous keyword, so no
+# lowercased copy of the query is needed. Case folding is ASCII-only, like
+# comparing against query.lower(), so e.g. "\u017favepoint" is not "savepoint"
+DANGEROUS_SQL = re.compile(
+    r'\b(?a:(?i:' + '|'.join(sorted(DANGEROUS_KEYWORDS)) + r'))\b'
+)
+
+# Same match for UTF-8 encoded queries. Word boundaries are ASCII-only here, so
+# a keyword next to a non-ASCII letter is also treated as dangerous
+DANGEROUS_SQL_BYTES = re.compile(DANGEROUS_SQL.pattern.encode('ascii'))
+
+# Dangerous keywords and statement separators, for the combined sanitize/validate scan
+DANGEROUS_SQL_OR_SEMICOLON = re.compile(DANGEROUS_SQL.pattern + '|;')
+
+# First ```sql code block; an unterminated block runs to the end of the text
+SQL_CODE_BLOCK = re.compile(r"```sql\b(.*?)(?:```|\Z)", re.DOTALL | re.IGNORECASE)
+
+# First markdown code block of any kind, with an optional language tag line
+# (```sqlite, ```python, ...) skipped
+CODE_BLOCK = re.compile(r"```(?:[^\W\d]\w*(?=[ \t]*\n))?(.*?)(?:```|\Z)", re.DOTALL)
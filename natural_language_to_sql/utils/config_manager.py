@@ -6,15 +6,22 @@ import os
 from pathlib import Path
 from typing import Dict, Any, Optional
 
+try:
+    # Faster JSON parsing/serialization when available
+    import orjson
+except ImportError:
+    orjson = None
+
+# Config directory, resolved once at import; NSQL_CONFIG_DIR overrides ~/.nsql
+CONFIG_DIR = Path(os.environ.get('NSQL_CONFIG_DIR') or os.path.expanduser('~/.nsql'))
+
 
 class ConfigManager:
     """Manages configuration for the NSQL application."""
     
     def __init__(self):
-        # Use user's home directory for config
-        self.config_dir = Path.home() / ".nsql"
+        self.config_dir = CONFIG_DIR
         self.config_file = self.config_dir / "config.json"
-        self.config_dir.mkdir(exist_ok=True)
         
         # Initialize with default values
         self.default_config = {
@@ -23,30 +30,47 @@ class ConfigManager:
             "gemini_model": "gemini-1.5-pro-latest"
         }
         
-        # Load existing config or create new one
-        self.config = self.load_config()
+        # Existing config is loaded on first access
+        self._config = None
+    
+    @property
+    def config(self) -> Dict[str, Any]:
+        """The current configuration, loaded from file on first access."""
+        if self._config is None:
+            self._config = self.load_config()
+        return self._config
+    
+    @config.setter
+    def config(self, config: Dict[str, Any]):
+        self._config = config
     
     def load_config(self) -> Dict[str, Any]:
         """Load configuration from file or return defaults."""
-        if self.config_file.exists():
-            try:
+        # Read the file directly instead of checking it exists first; a missing
+        # file raises FileNotFoundError and falls back to the defaults below
+        try:
+            if orjson is not None:
+                loaded_config = orjson.loads(self.config_file.read_bytes())
+            else:
                 with open(self.config_file, 'r') as f:
                     loaded_config = json.load(f)
-                    # Merge with defaults to ensure all keys exist
-                    config = self.default_config.copy()
-                    config.update(loaded_config)
-                    return config
-            except Exception:
-                # If there's an error loading the config, return defaults
-                return self.default_config.copy()
-        else:
+            # Merge with defaults to ensure all keys exist
+            config = self.default_config.copy()
+            config.update(loaded_config)
+            return config
+        except Exception:
+            # If there's an error loading the config, return defaults
             return self.default_config.copy()
     
     def save_config(self):
         """Save current configuration to file."""
         try:
-            with open(self.config_file, 'w') as f:
-                json.dump(self.config, f, indent=2)
+            self.config_dir.mkdir(parents=True, exist_ok=True)
+            if orjson is not None:
+                self.config_file.write_bytes(orjson.dumps(self.config, option=orjson.OPT_INDENT_2))
+            else:
+                with open(self.config_file, 'w') as f:
+                    json.dump(self.config, f, indent=2)
             return True
         except Exception as e:
             print(f"Error saving configuration: {e}")
@@ -86,5 +110,10 @@ class ConfigManager:
         self.save_config()
 
 
-# Global configuration manager instance
-config_manager = ConfigManager()
\ No newline at end of file
+def __getattr__(name):
+    # Global configuration manager instance, created on first access (PEP 562)
+    if name == 'config_manager':
+        global config_manager
+        config_manager = ConfigManager()
+        return config_manager
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
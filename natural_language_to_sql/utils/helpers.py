@@ -1,14 +1,23 @@
 """
 Utility functions for the Natural Language to SQL application.
 """
+import json
 import os
-import re
-from typing import Optional
+import pickle
+from functools import lru_cache
+from typing import Any, Dict, Optional
+from . import _patterns
 
 
+# Prompt line describing a single column
+_COL_TMPL = "- `{name}`: {type} [{null}{pk}{fk}]{default}\n"
+
+
+@lru_cache(maxsize=None)
 def get_env_variable(var_name: str, default: Optional[str] = None) -> str:
     """
     Get an environment variable or return a default value.
+    Values are read once per process; call get_env_variable.cache_clear() after changing the environment.
     """
     value = os.getenv(var_name)
     if value is None:
@@ -19,25 +28,35 @@ def get_env_variable(var_name: str, default: Optional[str] = None) -> str:
     return value
 
 
+def load_table_descriptions(file_path: str) -> list:
+    """
+    Load custom table descriptions from a JSON file.
+    Parsed results are cached per file modification time and size, so repeated loads
+    of an unchanged file skip parsing. Each call returns a new copy that callers may modify.
+    """
+    st = os.stat(file_path)
+    return pickle.loads(_load_json_cached(os.fspath(file_path), st.st_mtime_ns, st.st_size))
+
+
+@lru_cache(maxsize=32)
+def _load_json_cached(file_path: str, mtime_ns: int, size: int) -> bytes:
+    """
+    Parse a JSON file and return the result pickled. Unpickling makes an independent
+    copy for each caller and is faster than parsing the JSON again.
+    """
+    with open(file_path, 'rb') as f:
+        return pickle.dumps(json.load(f), protocol=pickle.HIGHEST_PROTOCOL)
+
+
 def validate_sql_query(sql_query: str) -> bool:
     """
     Basic validation of SQL query to prevent potentially dangerous operations.
     This is a simple implementation - in production, use a proper SQL parser.
     """
-    # Convert to lowercase for case-insensitive matching
-    query_lower = sql_query.lower().strip()
-    
-    # Dangerous SQL commands that could modify data or schema
-    dangerous_keywords = [
-        'drop', 'delete', 'truncate', 'alter', 'create', 'insert', 'update',
-        'grant', 'revoke', 'commit', 'rollback', 'savepoint', 'merge'
-    ]
-    
-    # Check for dangerous keywords but allow "select" and other safe operations
-    for keyword in dangerous_keywords:
-        # Use word boundaries to avoid partial matches
-        if re.search(r'\b' + re.escape(keyword) + r'\b', query_lower):
-            return False
+    # Check for dangerous keywords but allow "select" and other safe operations.
+    # Whole words only, so e.g. "updated_at" is not a match for "update"
+    if _patterns.DANGEROUS_SQL.search(sql_query):
+        return False
     
     # Additional checks could be added here:
     # - Check for SQL injection patterns
@@ -53,18 +72,45 @@ def sanitize_sql_query(sql_query: str) -> str:
     # Remove any semicolons that might allow multiple statements
     # (Though multiple statements could be part of a legitimate query)
     sanitized = sql_query.strip()
+    if not sanitized:
+        return sanitized
+    
+    # Ignore a trailing semicolon (we'll add it back later if needed)
+    end = len(sanitized) - 1 if sanitized[-1] == ';' else len(sanitized)
     
-    # Remove trailing semicolon if it exists (we'll add it back later if needed)
-    if sanitized.endswith(';'):
-        sanitized = sanitized[:-1]
+    # Remove any multi-statement attempts: only allow the first statement for safety.
+    # A semicolon right before the ignored one is kept, so "SELECT 1;;" gives "SELECT 1;"
+    pos = sanitized.find(';', 0, max(end - 1, 0))
+    if pos == -1:
+        return sanitized[:end]
+    return sanitized[:pos].rstrip()
+
+
+def validate_sql_query_bytes(sql_query: bytes) -> bool:
+    """
+    Version of validate_sql_query for UTF-8 encoded queries, avoiding a decode.
+    Same result for ASCII queries; a keyword next to a non-ASCII letter (e.g. "\u00e9update")
+    is also treated as dangerous, since word boundaries are ASCII-only for bytes.
+    """
+    return _patterns.DANGEROUS_SQL_BYTES.search(sql_query) is None
+
+
+def sanitize_sql_query_bytes(sql_query: bytes) -> bytes:
+    """
+    Version of sanitize_sql_query for UTF-8 encoded queries, avoiding a decode.
+    """
+    sanitized = sql_query.strip()
+    if not sanitized:
+        return sanitized
     
-    # Remove any multi-statement attempts
-    if ';' in sanitized[:-1]:  # If semicolon exists not at the end
-        statements = sanitized.split(';')
-        # Only allow the first statement for safety
-        sanitized = statements[0].strip()
+    # Ignore a trailing semicolon
+    end = len(sanitized) - 1 if sanitized.endswith(b';') else len(sanitized)
     
-    return sanitized
+    # Only allow the first statement for safety, keeping a semicolon right before the ignored one
+    pos = sanitized.find(b';', 0, max(end - 1, 0))
+    if pos == -1:
+        return sanitized[:end]
+    return sanitized[:pos].rstrip()
 
 
 def validate_and_sanitize_query(sql_query: str) -> tuple[bool, str]:
@@ -72,10 +118,48 @@ def validate_and_sanitize_query(sql_query: str) -> tuple[bool, str]:
     Validate and sanitize the SQL query.
     Returns a tuple: (is_valid, sanitized_query)
     """
-    # First sanitize the query
-    sanitized_query = sanitize_sql_query(sql_query)
+    # Same result as validate_sql_query(sanitize_sql_query(sql_query)), in a
+    # single pass: only dangerous keywords and semicolons are matched, and the
+    # first statement-separating semicolon ends the scan
+    sanitized = sql_query.strip()
+    
+    # Ignore a trailing semicolon, and keep one right before it (see sanitize_sql_query)
+    end = len(sanitized) - 1 if sanitized[-1:] == ';' else len(sanitized)
+    
+    is_valid = True
+    for match in _patterns.DANGEROUS_SQL_OR_SEMICOLON.finditer(sanitized, 0, end):
+        if match.group() != ';':
+            is_valid = False
+        elif match.start() < end - 1:
+            # Only allow the first statement for safety
+            return is_valid, sanitized[:match.start()].rstrip()
+    
+    return is_valid, sanitized[:end]
+
+
+def render_table_prompt_block(table: Dict[str, Any]) -> str:
+    """Render the prompt section describing a single table."""
+    parts = [f"\n### Table: `{table['name']}`\n", "**Columns:**\n"]
+    for col in table['columns']:
+        parts.append(_COL_TMPL.format_map({
+            'name': col['name'],
+            'type': col['type'],
+            'null': "NOT NULL" if col.get('nullable', True) == False else "NULL",
+            'pk': " (PRIMARY KEY)" if col.get('primary_key', False) else "",
+            'fk': " (FOREIGN KEY)" if col.get('foreign_key', False) else "",
+            'default': f", default: {col['default']}" if col.get('default') is not None else "",
+        }))
+        
+    # Add primary key information
+    primary_keys = table.get('primary_keys', [])
+    if primary_keys:
+        parts.append(f"\n**Primary Keys:** {', '.join([f'`{pk}`' for pk in primary_keys])}\n")
     
-    # Then validate
-    is_valid = validate_sql_query(sanitized_query)
+    # Add foreign key information
+    foreign_keys = table.get('foreign_keys', [])
+    if foreign_keys:
+        parts.append("\n**Foreign Keys:**\n")
+        for fk in foreign_keys:
+            parts.append(f"- `{fk['constrained_columns']}` references `{fk['referred_table']}.{fk['referred_columns']}`\n")
     
-    return is_valid, sanitized_query
\ No newline at end of file
+    return "".join(parts)
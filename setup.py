@@ -19,6 +19,9 @@ setup(
         "pandas>=2.0.0",
         "numpy>=1.24.0",
     ],
+    extras_require={
+        "speedups": ["orjson>=3.9.0"],
+    },
     entry_points={
         "console_scripts": [
             "nsql=natural_language_to_sql.cli.main:main",
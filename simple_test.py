@@ -5,7 +5,6 @@ Simple example to test the Natural Language to SQL application with an existing
 import os
 import sqlite3
 import tempfile
-from natural_language_to_sql.core.nsql_agent import NSQLAgent
 
 
 def create_test_database():
@@ -16,6 +15,8 @@ def create_test_database():
     
     # Connect to the database
     conn = sqlite3.connect(db_path)
+    # Throwaway database: skip fsyncs
+    conn.execute('PRAGMA synchronous=OFF')
     cursor = conn.cursor()
     
     # Create a sample table
@@ -37,10 +38,10 @@ def create_test_database():
         (5, 'Eva Brown', 'Marketing', 68000)
     ]
     
-    cursor.executemany('INSERT INTO employees VALUES (?, ?, ?, ?)', sample_data)
+    # Load the data in a single transaction, committed when the block exits
+    with conn:
+        cursor.executemany('INSERT INTO employees VALUES (?, ?, ?, ?)', sample_data)
     
-    # Commit and close
-    conn.commit()
     conn.close()
     
     return db_path
@@ -51,7 +52,8 @@ def main():
     db_path = create_test_database()
     print(f"Created test database at: {db_path}")
     
-    # Create the NSQL agent
+    # Create the NSQL agent (imported here since it pulls in the heavy ML stack)
+    from natural_language_to_sql.core.nsql_agent import NSQLAgent
     try:
         agent = NSQLAgent(f"sqlite:///{db_path}")
     except ValueError as e:
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Test script for the startup cost of the Natural Language to SQL CLI.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+# Modules that must only be imported once a query is actually run
+HEAVY_MODULES = [
+    'sentence_transformers',
+    'faiss',
+    'torch',
+    'google.generativeai',
+    'sqlalchemy',
+]
+
+
+def imported_modules(args, env=None):
+    """Run the CLI with -X importtime and return the set of imported module names."""
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-m', 'natural_language_to_sql.cli.main', *args],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    assert proc.returncode == 0, f"CLI exited with {proc.returncode}: {proc.stderr[-500:]}"
+    modules = set()
+    for line in proc.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            modules.add(line.rsplit('|', 1)[1].strip())
+    return modules
+
+
+def test_cli_imports():
+    """Check that help and config commands never import the heavy dependencies."""
+    print("Testing CLI startup imports...")
+
+    with tempfile.TemporaryDirectory() as home:
+        env = dict(os.environ, HOME=home)
+        for args in (['--help'], ['config', '--show']):
+            modules = imported_modules(args, env=env)
+            heavy = [m for m in HEAVY_MODULES if m in modules]
+            assert not heavy, f"'nsql {' '.join(args)}' imported heavy modules: {heavy}"
+            print(f"  nsql {' '.join(args)}: no heavy imports ✓")
+
+    print("\nAll CLI startup tests passed! ✓")
+
+
+if __name__ == "__main__":
+    test_cli_imports()
@@ -4,6 +4,8 @@ Test script for the configuration functionality of the Natural Language to SQL a
 """
 import tempfile
 import os
+import subprocess
+import sys
 from natural_language_to_sql.utils.config_manager import config_manager
 
 
@@ -57,5 +59,43 @@ def test_config():
     print("\nAll configuration tests passed! ✓")
 
 
+
+IMPORT_ORDERS = {
+    'submodule first': (
+        "from natural_language_to_sql.utils.config_manager import ConfigManager\n"
+        "from natural_language_to_sql.utils import config_manager\n"
+    ),
+    'package first': (
+        "from natural_language_to_sql.utils import config_manager\n"
+        "from natural_language_to_sql.utils.config_manager import ConfigManager\n"
+    ),
+}
+
+
+def test_config_manager_import_orders():
+    """Test that both import paths give the same ConfigManager instance in any order."""
+    print("Testing config_manager import orders...")
+
+    check = (
+        "import sys\n"
+        "module = sys.modules['natural_language_to_sql.utils.config_manager']\n"
+        "assert isinstance(config_manager, ConfigManager), type(config_manager)\n"
+        "assert module.config_manager is config_manager\n"
+        "config_manager.get_db_url()\n"
+    )
+    with tempfile.TemporaryDirectory() as config_dir:
+        env = dict(os.environ, NSQL_CONFIG_DIR=config_dir)
+        for label, imports in IMPORT_ORDERS.items():
+            proc = subprocess.run(
+                [sys.executable, '-c', imports + check],
+                capture_output=True,
+                text=True,
+                env=env,
+            )
+            assert proc.returncode == 0, f"{label}: {proc.stderr[-500:]}"
+            print(f"  {label}: ConfigManager instance ✓")
+
+
 if __name__ == "__main__":
-    test_config()
\ No newline at end of file
+    test_config()
+    test_config_manager_import_orders()
\ No newline at end of file
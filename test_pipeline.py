@@ -5,14 +5,14 @@ This script creates a sample database and tests the complete pipeline.
 """
 import os
 import tempfile
-from sqlalchemy import create_engine, text
-from natural_language_to_sql.core.nsql_agent import NSQLAgent
 
 
 def create_sample_database():
     """
     Create a sample database with test tables for demonstration.
     """
+    from sqlalchemy import create_engine, text
+    
     # Create a temporary SQLite database
     temp_db = tempfile.NamedTemporaryFile(delete=False, suffix='.db')
     temp_db.close()
@@ -45,21 +45,28 @@ def create_sample_database():
             )
         """))
         
-        # Insert sample data
-        conn.execute(text("""
-            INSERT INTO customers (id, name, email, age, city) VALUES
-                (1, 'John Doe', 'john@example.com', 30, 'New York'),
-                (2, 'Jane Smith', 'jane@example.com', 25, 'Los Angeles'),
-                (3, 'Bob Johnson', 'bob@example.com', 35, 'Chicago')
-        """))
+        # Insert sample data, one executemany per table
+        conn.execute(
+            text("INSERT INTO customers (id, name, email, age, city) VALUES (:id, :name, :email, :age, :city)"),
+            [
+                {'id': 1, 'name': 'John Doe', 'email': 'john@example.com', 'age': 30, 'city': 'New York'},
+                {'id': 2, 'name': 'Jane Smith', 'email': 'jane@example.com', 'age': 25, 'city': 'Los Angeles'},
+                {'id': 3, 'name': 'Bob Johnson', 'email': 'bob@example.com', 'age': 35, 'city': 'Chicago'},
+            ]
+        )
         
-        conn.execute(text("""
-            INSERT INTO orders (id, customer_id, product_name, quantity, price, order_date) VALUES
-                (1, 1, 'Laptop', 1, 999.99, '2023-01-15'),
-                (2, 1, 'Mouse', 2, 25.99, '2023-02-20'),
-                (3, 2, 'Keyboard', 1, 79.99, '2023-03-10'),
-                (4, 3, 'Monitor', 1, 299.99, '2023-04-05')
-        """))
+        conn.execute(
+            text("""
+                INSERT INTO orders (id, customer_id, product_name, quantity, price, order_date)
+                VALUES (:id, :customer_id, :product_name, :quantity, :price, :order_date)
+            """),
+            [
+                {'id': 1, 'customer_id': 1, 'product_name': 'Laptop', 'quantity': 1, 'price': 999.99, 'order_date': '2023-01-15'},
+                {'id': 2, 'customer_id': 1, 'product_name': 'Mouse', 'quantity': 2, 'price': 25.99, 'order_date': '2023-02-20'},
+                {'id': 3, 'customer_id': 2, 'product_name': 'Keyboard', 'quantity': 1, 'price': 79.99, 'order_date': '2023-03-10'},
+                {'id': 4, 'customer_id': 3, 'product_name': 'Monitor', 'quantity': 1, 'price': 299.99, 'order_date': '2023-04-05'},
+            ]
+        )
         
         conn.commit()
     
@@ -135,7 +142,9 @@ def test_pipeline():
         }
     ]
     
-    # Set up the NSQL agent with custom table descriptions
+    # Set up the NSQL agent with custom table descriptions (imported here since
+    # it pulls in the heavy ML stack)
+    from natural_language_to_sql.core.nsql_agent import NSQLAgent
     try:
         agent = NSQLAgent(db_url, custom_table_descriptions)
     except ValueError as e:
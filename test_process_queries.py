@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Test script for processing several queries concurrently with NSQLAgent.process_queries.
+The RAG system and Gemini model are replaced by stubs, so no API key or embedding model is needed.
+"""
+import asyncio
+import logging
+import threading
+
+from sqlalchemy import create_engine
+
+from natural_language_to_sql.core.nsql_agent import NSQLAgent
+
+
+class StubRAGSystem:
+    """Returns the same single table for every query, recording the threads it ran on."""
+
+    def __init__(self):
+        self.threads = set()
+
+    def retrieve_relevant_tables(self, query, k=3, min_score=0.0):
+        self.threads.add(threading.current_thread())
+        return [{'name': 'answers', 'similarity_score': 1.0}]
+
+
+class StubGeminiLLM:
+    """
+    Stands in for GeminiLLM. Like the Gemini async client, it binds to the event loop
+    of its first call and fails when awaited from a different loop.
+    """
+
+    def __init__(self):
+        self.loop = None
+
+    async def agenerate_sql(self, natural_query, relevant_tables):
+        loop = asyncio.get_running_loop()
+        if self.loop is None:
+            self.loop = loop
+        elif self.loop is not loop:
+            raise RuntimeError("async client is attached to a different loop")
+        # Later queries answer first, so results only line up if order is preserved
+        await asyncio.sleep(0.01 * (5 - int(natural_query.split()[-1])))
+        return f"SELECT '{natural_query}' AS answer"
+
+
+def create_agent():
+    """Create an NSQLAgent with stubbed retrieval and SQL generation."""
+    agent = NSQLAgent.__new__(NSQLAgent)
+    agent.db_url = "sqlite://"
+    agent.min_score = 0.0
+    agent.engine = create_engine(agent.db_url)
+    agent.gemini_llm = StubGeminiLLM()
+    agent.rag_system = StubRAGSystem()
+    agent.logger = logging.getLogger(__name__)
+    agent._runner = None
+    return agent
+
+
+def test_process_queries():
+    """Test two consecutive process_queries calls on the same agent."""
+    print("Testing process_queries...")
+
+    with create_agent() as agent:
+        for run in (1, 2):
+            queries = [f"run {run} query {i}" for i in range(5)]
+            results = agent.process_queries(queries)
+
+            assert len(results) == len(queries), f"Expected {len(queries)} results, got {len(results)}"
+            for query, result in zip(queries, results):
+                assert result.startswith(f"Generated SQL: SELECT '{query}' AS answer"), result
+                assert f"answer\n{query}\n" in result, result
+            print(f"{run}. {len(results)} results returned in query order ✓")
+
+    # Retrieval runs in worker threads, not on the event loop
+    assert threading.main_thread() not in agent.rag_system.threads
+    print("3. Table retrieval ran off the event loop ✓")
+
+    # Leaving the with block closes the event loop
+    assert agent._runner is None, "close() did not release the event loop"
+    print("4. Event loop closed with the agent ✓")
+
+    print("\nAll process_queries tests passed! ✓")
+
+
+if __name__ == "__main__":
+    test_process_queries()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Test script for the on-disk FAISS index cache of the RAG system.
+The embedding model is replaced by a stub, so no model download is needed.
+"""
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy import create_engine, text
+
+from natural_language_to_sql.core import rag_system
+from natural_language_to_sql.core.rag_system import RAGSystem
+
+
+CUSTOM_DESCRIPTIONS = [{
+    'name': 'notes',
+    'columns': [{'name': 'body', 'type': 'TEXT'}],
+}]
+
+
+class StubModel:
+    """Deterministic normalized embeddings, counting how many texts were encoded."""
+
+    def __init__(self):
+        self.encoded = 0
+
+    def encode(self, texts, **kwargs):
+        self.encoded += len(texts)
+        vectors = np.array([
+            np.frombuffer(hashlib.sha256(t.encode('utf-8')).digest(), dtype=np.uint8)[:8]
+            for t in texts
+        ], dtype='float32') + 1
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def create_database(path, tables):
+    """Create a SQLite database with the given tables and return its engine."""
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        for table in tables:
+            conn.execute(text(f"CREATE TABLE IF NOT EXISTS {table} (id INTEGER PRIMARY KEY, name TEXT)"))
+    return engine
+
+
+def cached_indexes(cache_dir):
+    """Return the names of the files in the cache directory."""
+    return sorted(p.name for p in Path(cache_dir).iterdir())
+
+
+def test_rag_cache():
+    """Test cache hits, invalidation on schema changes and pruning of old entries."""
+    print("Testing RAG index cache...")
+
+    model = StubModel()
+    rag_system._load_st_model = lambda model_name: model
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_dir = Path(tmp) / "cache"
+        rag_system.EMBEDDING_CACHE_DIR = cache_dir
+        engine = create_database(os.path.join(tmp, "shop.db"), ["customers", "orders"])
+
+        # 1. The first run encodes all tables and saves the index
+        RAGSystem(engine)
+        assert model.encoded == 2, f"Expected 2 encoded tables, got {model.encoded}"
+        assert len(cached_indexes(cache_dir)) == 1, cached_indexes(cache_dir)
+        print("1. Index built and cached ✓")
+
+        # 2. An unchanged schema is loaded from the cache
+        rag = RAGSystem(engine)
+        assert model.encoded == 2, "Unchanged schema was encoded again"
+        assert rag.index.ntotal == 2
+        print("2. Cache hit for an unchanged schema ✓")
+
+        # 3. Custom table descriptions get their own entry next to the plain one
+        RAGSystem(engine, CUSTOM_DESCRIPTIONS)
+        assert model.encoded == 5, f"Expected 5 encoded tables, got {model.encoded}"
+        RAGSystem(engine)
+        RAGSystem(engine, CUSTOM_DESCRIPTIONS)
+        assert model.encoded == 5, "Runs with and without custom descriptions evicted each other"
+        assert len(cached_indexes(cache_dir)) == 2, cached_indexes(cache_dir)
+        print("3. Runs with and without custom descriptions both hit the cache ✓")
+
+        # 4. A schema change invalidates the cache and prunes this database's old entries
+        create_database(os.path.join(tmp, "shop.db"), ["products"])
+        rag = RAGSystem(engine)
+        assert model.encoded == 8, f"Expected 8 encoded tables, got {model.encoded}"
+        assert rag.index.ntotal == 3
+        assert len(cached_indexes(cache_dir)) == 1, cached_indexes(cache_dir)
+        print("4. Schema change rebuilt the index and pruned old entries ✓")
+
+        # 5. Indexes of other databases beyond MAX_CACHED_INDEXES are pruned, oldest first
+        rag_system.MAX_CACHED_INDEXES = 2
+        temp_rags = [
+            RAGSystem(create_database(os.path.join(tmp, f"temp{i}.db"), [f"t{i}"]))
+            for i in range(3)
+        ]
+        indexes = cached_indexes(cache_dir)
+        assert len(indexes) == 2, indexes
+        assert not any(name.endswith('.tmp') for name in indexes), indexes
+        kept = {name.split('-')[0] for name in indexes}
+        assert kept == {rag._database_cache_key() for rag in temp_rags[1:]}, indexes
+        print("5. Least recently used indexes pruned ✓")
+
+    print("\nAll RAG cache tests passed! ✓")
+
+
+if __name__ == "__main__":
+    test_rag_cache()
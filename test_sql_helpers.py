@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Test script for the SQL validation and sanitization helpers of the Natural Language to SQL application.
+"""
+import random
+
+from natural_language_to_sql.utils.helpers import (
+    sanitize_sql_query,
+    sanitize_sql_query_bytes,
+    validate_and_sanitize_query,
+    validate_sql_query,
+    validate_sql_query_bytes,
+)
+
+
+# Queries with their expected (is_valid, sanitized_query). Semicolons inside string
+# literals are not understood (known limitation), so such queries are left out
+SQL_CASES = [
+    ("SELECT * FROM users", (True, "SELECT * FROM users")),
+    ("  SELECT * FROM users;  ", (True, "SELECT * FROM users")),
+    ("SELECT 1;;", (True, "SELECT 1;")),
+    ("SELECT 1 ;; ", (True, "SELECT 1 ;")),
+    ("SELECT 1; SELECT 2", (True, "SELECT 1")),
+    ("SELECT 1 ; SELECT 2;", (True, "SELECT 1")),
+    ("SELECT 1; DROP TABLE users", (True, "SELECT 1")),
+    ("SELECT 1; delete from users;", (True, "SELECT 1")),
+    ("SELECT * FROM t; -- update later", (True, "SELECT * FROM t")),
+    ("SELECT drop;", (False, "SELECT drop")),
+    ("SELECT drop;; x", (False, "SELECT drop")),
+    ("DROP TABLE users;", (False, "DROP TABLE users")),
+    ("select * from t where Update = 1", (False, "select * from t where Update = 1")),
+    ("SELECT updated_at, drop_count FROM stats", (True, "SELECT updated_at, drop_count FROM stats")),
+    ("SELECT created, inserts, merged FROM log", (True, "SELECT created, inserts, merged FROM log")),
+    ("SELECT 1 FROM ſavepoint", (True, "SELECT 1 FROM ſavepoint")),
+    (";", (True, "")),
+    (";;", (True, ";")),
+    ("", (True, "")),
+    ("   \n\t ", (True, "")),
+]
+
+
+def separate_steps(query):
+    """Sanitize, then validate the sanitized query, as two separate passes."""
+    sanitized = sanitize_sql_query(query)
+    return validate_sql_query(sanitized), sanitized
+
+
+def test_validate_and_sanitize_query():
+    """Test that the single-pass helper matches sanitizing and then validating."""
+    print("Testing validate_and_sanitize_query...")
+
+    for i, (query, expected) in enumerate(SQL_CASES, 1):
+        separate = separate_steps(query)
+        combined = validate_and_sanitize_query(query)
+        assert combined == separate, f"{query!r}: combined {combined} != separate {separate}"
+        assert combined == expected, f"{query!r}: expected {expected}, got {combined}"
+        print(f"{i}. {query!r} -> {combined} ✓")
+
+    # Random queries built from keywords, identifiers, semicolons and whitespace
+    rng = random.Random(0)
+    tokens = ['SELECT', 'drop', 'Update', 'updated_at', 'x', '1', ';', ' ', '\t', '\u00e9', '\u017favepoint']
+    for _ in range(20000):
+        query = ''.join(rng.choice(tokens) for _ in range(rng.randint(0, 10)))
+        assert validate_and_sanitize_query(query) == separate_steps(query), repr(query)
+    print(f"{len(SQL_CASES) + 1}. 20000 random queries match the separate steps ✓")
+
+    print("\nAll SQL helper tests passed! ✓")
+
+
+def test_bytes_helpers():
+    """Test that the bytes helpers match the str helpers on ASCII queries."""
+    print("Testing bytes SQL helpers...")
+
+    for i, (query, _) in enumerate(SQL_CASES, 1):
+        if not query.isascii():
+            continue
+        encoded = query.encode('utf-8')
+        assert validate_sql_query_bytes(encoded) == validate_sql_query(query), query
+        assert sanitize_sql_query_bytes(encoded) == sanitize_sql_query(query).encode('utf-8'), query
+        print(f"{i}. {query!r} matches the str helpers ✓")
+
+    # Word boundaries are ASCII-only for bytes, so a keyword after a non-ASCII
+    # letter is rejected although the str version accepts it
+    query = "SELECT caf\u00e9update FROM t"
+    assert validate_sql_query(query)
+    assert not validate_sql_query_bytes(query.encode('utf-8'))
+    print(f"{len(SQL_CASES) + 1}. {query!r} only rejected as bytes ✓")
+
+    print("\nAll bytes SQL helper tests passed! ✓")
+
+
+if __name__ == "__main__":
+    test_validate_and_sanitize_query()
+    test_bytes_helpers()